@@ -8,7 +8,9 @@ import logging
 import html2text
 import pandas as pd
 import random
-from concurrent.futures import ThreadPoolExecutor
+import heapq
+import itertools
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import streamlit as st
 from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.util.retry import Retry
@@ -21,23 +23,73 @@ st.title("晋江评论爬虫小助手")
 
 # 输入作品 ID 和章节范围
 novel_id = st.text_input("请输入作品ID：", "")
-chapter_range_input = st.text_input("请输入章节范围（例如：1-5 或 1,3,5）：", "")
+chapter_range_input = st.text_input("请输入章节范围（例如：1-5、1,3,5 或 1-50,80,100-）：", "")
 
 # 提取章节范围
+# 返回 (起始章, 结束章) 区间列表，结束章为 None 表示开放区间（如 "100-"），
+# 具体章节号在爬取时再按需展开，避免 "1-5000" 这类输入一次性生成大列表
 def parse_chapter_range(chapter_range_input):
     chapter_range = []
     try:
-        if '-' in chapter_range_input:  # 处理连续区间
-            start, end = map(int, chapter_range_input.split('-'))
-            chapter_range = list(range(start, end + 1))
-        elif ',' in chapter_range_input:  # 处理分开的章节号
-            chapter_range = list(map(int, chapter_range_input.split(',')))
-        else:  # 如果是单个章节
-            chapter_range = [int(chapter_range_input)]
+        for part in chapter_range_input.replace("，", ",").split(','):
+            part = part.strip()
+            if '-' in part:  # 处理连续区间
+                start, end = part.split('-', 1)
+                start = int(start)
+                end = int(end) if end.strip() else None
+                if start < 1 or (end is not None and end < start):
+                    raise ValueError(part)
+                chapter_range.append((start, end))
+            else:  # 单个章节
+                chapter_id = int(part)
+                if chapter_id < 1:
+                    raise ValueError(part)
+                chapter_range.append((chapter_id, chapter_id))
     except ValueError:
-        st.error("章节范围格式错误，请输入正确的范围（例如：1-5 或 1,3,5）。")
+        st.error("章节范围格式错误，请输入正确的范围（例如：1-5、1,3,5 或 1-50,80,100-）。")
+        chapter_range = []
     return chapter_range
 
+# 整理章节区间：补全开放区间、按目录截掉不存在的章节，并合并重叠区间
+def resolve_chapter_range(chapter_range, last_chapter=None):
+    segments = []
+    for start, end in chapter_range:
+        if last_chapter is None:
+            if end is None:
+                st.warning(f"未获取到章节目录，无法确定 {start}- 的结束章节，本次仅爬取第 {start} 章。")
+                end = start
+        else:
+            if start > last_chapter:
+                continue  # 整段都超出目录
+            end = last_chapter if end is None else min(end, last_chapter)
+        segments.append((start, end))
+
+    if chapter_range and not segments:
+        st.warning(f"所选章节均超出目录范围（共 {last_chapter} 章），没有可爬取的章节。")
+
+    merged = []
+    for start, end in sorted(segments):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+# 按需展开章节区间：从后往前逐个产出章节号，最新章节优先
+def iter_chapters(segments):
+    for start, end in reversed(segments):
+        yield from range(end, start - 1, -1)
+
+# 解析章节目录中的数量，支持 "1.2万" 这类写法，无法识别时返回 None
+def parse_count(text):
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)(万?)", text.replace(",", ""))
+    if not match:
+        return None
+    count = float(match.group(1))
+    if match.group(2):
+        count *= 10000
+    return int(count)
+
 # 核心爬取功能
 def create_session():
     session = requests.Session()
@@ -52,8 +104,9 @@ def create_session():
 
 # 获取章节标题
 def get_chapter_titles_v2(novel_id):
-    global chapter_titles
+    global chapter_titles, chapter_costs
     chapter_titles = {}
+    chapter_costs = {}  # 章节目录中的评论数（或点击数），用于估计爬取耗时
     try:
         logging.info(f"开始爬取小说 {novel_id} 的章节标题...")
         session = create_session()
@@ -69,16 +122,37 @@ def get_chapter_titles_v2(novel_id):
         soup = bs4.BeautifulSoup(response.content.decode("gbk", errors="ignore"), "html.parser")
 
         rows = soup.select("tr")
+        chapter_table = soup.find("table", id="oneboolt")  # 章节列表所在的表格
+        cost_column = None
         for row in rows:
-            cells = row.find_all("td")
+            cells = row.find_all(["td", "th"])
             if len(cells) < 2:
                 continue
 
             chapter_id = cells[0].get_text(strip=True)
             chapter_title = cells[1].get_text(strip=True)
 
+            # 章节列表的表头行：定位评论数列，没有则退而使用点击数列
+            # （点击数随章节递减，只能粗略代替评论数）
+            if cost_column is None and not chapter_id.isdigit():
+                if chapter_table is None or row.find_parent("table") is not chapter_table:
+                    continue
+                headers = [cell.get_text(strip=True) for cell in cells]
+                if not any("章节" in header or "标题" in header for header in headers):
+                    continue
+                for keyword in ("评论", "点击"):
+                    matched = [i for i, header in enumerate(headers) if keyword in header]
+                    if matched:
+                        cost_column = matched[0]
+                        break
+                continue
+
             if chapter_id.isdigit():
                 chapter_titles[int(chapter_id)] = chapter_title
+                if cost_column is not None and cost_column < len(cells):
+                    count = parse_count(cells[cost_column].get_text(strip=True))
+                    if count is not None:
+                        chapter_costs[int(chapter_id)] = count
 
         logging.info(f"成功提取章节标题，共 {len(chapter_titles)} 章。")
     except Exception as e:
@@ -142,16 +216,75 @@ def get_comments_for_chapter(chapter_id, cookies=""):
         logging.error(f"爬取章节 {chapter_id} 评论失败: {e}")
         return []
 
+# 调度章节爬取：先提交所选区间内评论最多的几章，让耗时最长的章节最早开始；
+# 其余章节按最新优先的顺序分窗口展开，窗口内评论多的章节先提交。
+# 完成一章就产出一章，避免单个大章节拖住后面的结果
+def schedule_chapters(segments, max_workers=5):
+    def in_segments(chapter_id):
+        return any(start <= chapter_id <= end for start, end in segments)
+
+    heavy = heapq.nlargest(
+        max_workers,
+        (chapter_id for chapter_id, cost in chapter_costs.items() if cost > 0 and in_segments(chapter_id)),
+        key=chapter_costs.get,
+    )
+    heavy_set = set(heavy)
+    chapters = itertools.chain(
+        heavy,
+        (chapter_id for chapter_id in iter_chapters(segments) if chapter_id not in heavy_set),
+    )
+
+    window_size = max_workers * 4
+    counter = itertools.count()  # 保证同优先级时先取出的章节先提交
+    pending = []
+    running = {}  # future -> 章节号
+
+    def refill():
+        # 仅在待提交队列耗尽时再向后展开一个窗口
+        if pending:
+            return
+        for chapter_id in itertools.islice(chapters, window_size):
+            cost = chapter_costs.get(chapter_id, 0)
+            heapq.heappush(pending, (-cost, next(counter), chapter_id))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        refill()
+        while pending or running:
+            while pending and len(running) < max_workers * 2:
+                _, _, chapter_id = heapq.heappop(pending)
+                future = executor.submit(get_comments_for_chapter, chapter_id)
+                running[future] = chapter_id
+                refill()
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield running.pop(future), future.result()
+
 # 执行爬取
 def run_crawler(novel_id, chapter_range):
     get_chapter_titles_v2(novel_id)
-    
+
+    last_chapter = max(chapter_titles) if chapter_titles else None
+    segments = resolve_chapter_range(chapter_range, last_chapter)
+    total = sum(end - start + 1 for start, end in segments)
+    if not total:
+        return []
+
+    progress_bar = st.progress(0, text=f"已完成 0/{total} 章")
+    comments_by_chapter = {}
+    for chapter_id, result in schedule_chapters(segments):
+        comments_by_chapter[chapter_id] = result
+        finished = len(comments_by_chapter)
+        logging.info(f"第 {chapter_id} 章爬取完成，共 {len(result)} 条评论，已完成 {finished} 章。")
+        progress_bar.progress(
+            finished / total,
+            text=f"已完成 {finished}/{total} 章（第 {chapter_id} 章：{len(result)} 条评论）",
+        )
+
+    # 导出时仍按章节顺序排列
     all_comments = []
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        results = executor.map(get_comments_for_chapter, chapter_range)
-        for result in results:
-            all_comments.extend(result)
-            time.sleep(random.uniform(1, 3))  # 防止过于频繁的请求
+    for chapter_id in sorted(comments_by_chapter):
+        all_comments.extend(comments_by_chapter[chapter_id])
 
     return all_comments
 
@@ -178,7 +311,7 @@ if st.button("开始爬取"):
                 st.success(f"评论数据已成功保存！文件：{output_file}")
                 st.download_button(label="下载评论数据", data=open(output_file, "rb"), file_name=output_file)
         else:
-            st.error("章节范围格式错误，请输入正确的范围（例如：1-5 或 1,3,5）。")
+            st.error("章节范围格式错误，请输入正确的范围（例如：1-5、1,3,5 或 1-50,80,100-）。")
 
 # 确保文件存在
 def ensure_files_exist():